@@ -12,19 +12,52 @@ Usage:
             tmp_dir [default: invenio.config.TMPDIR]]
 """
 
-import gzip
+import io
+import json
 import os
 import os.path
 import sys
-import urllib
+import urllib2
+import zlib
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    # SIMD-accelerated zlib (Intel ISA-L bindings, 'pip install isal');
+    # delivers 2-3x the inflate throughput of plain zlib
+    from isal import isal_zlib as _zlib
+except ImportError:
+    _zlib = zlib
 
 from lxml import etree
 
+try:
+    # Compiled variant of '_AuthorityIdsTarget' (see inspire_target.pyx);
+    # lxml calls Cython-compiled parser targets through a C-level fast path
+    from inspire_target import InspireTarget
+except ImportError:
+    InspireTarget = None
+
+try:
+    # Backport for Python 2 ('pip install futures')
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
+
 from invenio.bibtask import (
     task_low_level_submission,
     task_sleep_now_if_required,
     write_message)
 from invenio.config import CFG_TMPDIR
+try:
+    from invenio.dbquery import run_sql
+except ImportError:
+    # No direct SQL access; 'get_ccids_bulk' falls back to per-record
+    # 'get_fieldvalues' lookups
+    run_sql = None
 from invenio.search_engine import perform_request_search
 from invenio.search_engine_utils import get_fieldvalues
 
@@ -32,8 +65,36 @@ from invenio.search_engine_utils import get_fieldvalues
 SYNC_URL_INSPIRE_RECORDS_SRC = (
     "http://inspirehep.net/dumps/HepNames-records.xml.gz")
 SYNC_LOCAL_TMP_DIR = CFG_TMPDIR
-SYNC_LOCAL_INSPIRE_RECORDS_FILE_NAME = "HepNames-records.xml.gz"
 SYNC_LOCAL_CDS_RECORDS_UPDATES_FILE_NAME = "cds-records-updates.xml"
+# Cache of the parsed dump plus the HTTP validators it was fetched with.
+# INSPIRE updates the dump monthly, so most runs can skip download and parse
+SYNC_LOCAL_AUTHORITY_IDS_CACHE_FILE_NAME = "HepNames-authority-ids.pkl"
+SYNC_LOCAL_AUTHORITY_IDS_META_FILE_NAME = "HepNames-authority-ids-meta.json"
+# Record ids synchronized by previous runs, one id per line; they are
+# skipped on subsequent runs. Remove the file to force a full resync
+SYNC_LOCAL_SYNCED_RECORD_IDS_FILE_NAME = "cds-synced-record-ids.txt"
+# Buffer size (in bytes) for reading the compressed dump. The 8 KB gzip
+# default is too small for a multi-hundred-MB file; large chunks also cut
+# the per-call inflate overhead
+SYNC_GZIP_BUFFER_SIZE = 256 * 1024
+# Number of record ids per SQL query, keeping the IN-list well below
+# MySQL's 'max_allowed_packet'
+SYNC_SQL_CHUNK_SIZE = 1000
+# Number of worker threads for the per-record fallback of 'get_ccids_bulk';
+# the lookups are I/O-bound on MySQL
+SYNC_THREAD_POOL_SIZE = 16
+
+# Sentinel returned by 'get_inspire_dump' when the server answers a
+# conditional GET with HTTP 304
+_NOT_MODIFIED = object()
+
+# Prefixes labeling the authority ids in MARC field '035__a'. The 'HEAD'
+# variants lack the closing parenthesis and are matched against the left
+# part of an rpartition(')') split, see '_extract_ccid'
+_PREFIX_INSPIRE = "AUTHOR|(INSPIRE)"
+_PREFIX_CERN = "AUTHOR|(SzGeCERN)"
+_PREFIX_INSPIRE_HEAD = _PREFIX_INSPIRE[:-1]
+_PREFIX_CERN_HEAD = _PREFIX_CERN[:-1]
 
 
 def get_record_ids():
@@ -41,62 +102,186 @@ def get_record_ids():
     return perform_request_search(cc="CERN People")
 
 
-def get_inspire_dump(src, dest_gz_tmp):
-    """Return file content for a given gzipped file.
+class _GunzipStream(object):
+
+    """Minimal read-only file-like object unzipping another stream on the fly.
+
+    'gzip.GzipFile' requires a seekable file object, which a HTTP response is
+    not, hence the plain 'zlib.decompressobj' loop. Decompression errors are
+    re-raised as IOError, matching what 'gzip' would raise.
+    """
+
+    def __init__(self, fileobj, chunk_size=SYNC_GZIP_BUFFER_SIZE):
+        self._fileobj = fileobj
+        self._chunk_size = chunk_size
+        # '32 + MAX_WBITS' makes zlib expect the gzip header and trailer
+        self._decompressor = _zlib.decompressobj(32 + _zlib.MAX_WBITS)
+        self._buffer = b""
+        self._eof = False
+        # HTTP validators of the response, filled in by 'get_inspire_dump'
+        self.etag = None
+        self.last_modified = None
+
+    def read(self, size=-1):
+        """Return up to 'size' decompressed bytes ('' at EOF)."""
+        parts = [self._buffer]
+        have = len(self._buffer)
+        self._buffer = b""
 
-    'src' will be copied to 'dest_gz_tmp' representing the local file path. The
-    copy will be removed automatically once 'src' has been unzipped and its
-    content read.
+        try:
+            while not self._eof and (size < 0 or have < size):
+                chunk = self._fileobj.read(self._chunk_size)
+                if not chunk:
+                    parts.append(self._decompressor.flush())
+                    self._eof = True
+                    break
+                data = self._decompressor.decompress(chunk)
+                parts.append(data)
+                have += len(data)
+        except _zlib.error as e:
+            raise IOError("Not a gzipped stream. ({0})".format(e))
+
+        data = b"".join(parts)
+        if 0 <= size < len(data):
+            self._buffer = data[size:]
+            data = data[:size]
+        return data
+
+    def close(self):
+        self._fileobj.close()
+
+
+def get_inspire_dump(src, headers=None):
+    """Return a file-like object streaming the unzipped content of 'src'.
+
+    The HTTP response is decompressed on the fly, so the dump flows from the
+    network through zlib into the XML parser without touching disk and
+    without ever being buffered in memory as a whole.
 
     :param string src: valid URL to the gzip (.gz) file
         Example:
             "http://inspirehep.net/dumps/HepNames-records.xml.gz"
-    :param string dest_gz_tmp: temporary local file path for the copy of 'src'
-        Example:
-            "/tmp/HepNames-records.xml.gz"
+    :param dict headers: optional HTTP request headers, e.g. the
+        'If-None-Match'/'If-Modified-Since' pair sent by 'get_authority_ids'
 
-    :return: file content of 'src' or None, if no valid 'src'
+    :return: file-like object of the unzipped 'src', '_NOT_MODIFIED' if the
+        server answered a conditional GET with HTTP 304, or None, if no
+        valid 'src'
     """
-    xml_file_content = None
-
     try:
-        # Save 'src' temporary to disk ('dest_gz_tmp')
-        urllib.urlretrieve(src, dest_gz_tmp)
-    except IOError as e:
+        response = urllib2.urlopen(urllib2.Request(src, headers=headers or {}))
+    except urllib2.HTTPError as e:
+        if e.code == 304:
+            return _NOT_MODIFIED
         write_message(
-            "Error: failed to copy '{0}' to '{1}'. ({2})".format(
-                src, dest_gz_tmp, e),
+            "Error: failed to open '{0}'. ({1})".format(src, e),
             sys.stderr)
         return
-
-    try:
-        # Since we are running Python 2.6.6
-        f = gzip.open(dest_gz_tmp, "rb")
-        xml_file_content = f.read()
-        f.close()
-    except IOError as e:
+    except (IOError, ValueError) as e:
         write_message(
-            "Error: failed to unzip '{0}'. ({1})".format(dest_gz_tmp, e),
+            "Error: failed to open '{0}'. ({1})".format(src, e),
             sys.stderr)
+        return
 
-    try:
-        # Remove 'dest_gz_tmp' from disk
-        os.remove(dest_gz_tmp)
-    except OSError as e:
-        write_message(
-            "Error: failed to remove '{0}' from disk. ({1})".format(
-                dest_gz_tmp, e),
-            sys.stderr)
+    xml_stream = _GunzipStream(response)
+    info = response.info()
+    xml_stream.etag = info.getheader("ETag")
+    xml_stream.last_modified = info.getheader("Last-Modified")
+
+    return xml_stream
 
-    return xml_file_content
 
+class _AuthorityIdsTarget(object):
 
-def parse_inspire_xml(xml_content):
-    """Parse xml_content and return a dictionary of authority ids.
+    """Parser target collecting authority ids without building a tree.
 
-    Consider records having a CCID and INSPIRE id.
+    Implements lxml's target interface ('start', 'end', 'data', 'close').
+    The vast majority of HepNames records carry no CERN id and would be
+    discarded right away; this state machine never allocates an Element
+    for them in the first place.
 
-    :param string xml_content: xml file content representing MARC XML records
+    Keep in sync with the compiled variant in 'inspire_target.pyx'.
+    """
+
+    def __init__(self):
+        self.authority_ids = {}
+        # Inside a '035' datafield / a subfield worth collecting?
+        self._in_035 = False
+        self._collecting = False
+        self._subfield_code = None
+        self._text = []
+        # Subfields '9' (source) and 'a' (value) of the current datafield
+        self._source = None
+        self._value = None
+        self._inspire_id = None
+        self._cern_id = None
+        # Both ids found; the remaining datafields of the record (ORCID,
+        # BAI, ...) can be skipped altogether
+        self._done = False
+
+    def start(self, tag, attrib):
+        if tag == "subfield":
+            # Only the subfields '9' and 'a' of a '035' datafield matter;
+            # buffering text for anything else is wasted work
+            if self._in_035:
+                code = attrib.get("code")
+                if code == "9" or code == "a":
+                    self._subfield_code = code
+                    self._text = []
+                    self._collecting = True
+        elif tag == "datafield":
+            if not self._done and attrib.get("tag") == "035":
+                self._in_035 = True
+                self._source = None
+                self._value = None
+        elif tag == "record":
+            self._inspire_id = None
+            self._cern_id = None
+            self._done = False
+
+    def data(self, data):
+        if self._collecting:
+            self._text.append(data)
+
+    def end(self, tag):
+        if tag == "subfield":
+            if self._collecting:
+                if self._subfield_code == "9":
+                    self._source = "".join(self._text)
+                else:
+                    self._value = "".join(self._text)
+                self._collecting = False
+                self._subfield_code = None
+                self._text = []
+        elif tag == "datafield":
+            if self._in_035:
+                if self._value:
+                    if self._source == "INSPIRE":
+                        self._inspire_id = self._value
+                    elif self._source == "CERN":
+                        self._cern_id = self._value
+                self._in_035 = False
+                if self._inspire_id and self._cern_id:
+                    self._done = True
+        elif tag == "record":
+            if self._inspire_id and self._cern_id:
+                self.authority_ids[
+                    self._cern_id.split("-", 1)[-1]] = self._inspire_id
+
+    def close(self):
+        return self.authority_ids
+
+
+def parse_inspire_xml(xml_source):
+    """Parse xml_source and return a dictionary of authority ids.
+
+    Consider records having a CCID and INSPIRE id. The records are scanned
+    by a SAX-style parser target while the XML is tokenized, so no tree is
+    built and the memory usage stays constant regardless of the size of the
+    dump.
+
+    :param xml_source: MARC XML records, either as a string or as a file-like
+        object
         Example:
             '''
             <record>
@@ -122,38 +307,123 @@ def parse_inspire_xml(xml_content):
             <!-- ... -->
             '''
 
-    :return: dictionary containing CERN and INSPIRE ids
+    :return: dictionary mapping CCIDs to INSPIRE ids. The "CERN-" prefix is
+        stripped once at parse time, so lookups by CCID need no per-record
+        string formatting
         Example:
-            {"CERN-389900": "INSPIRE-00146525", ...}
+            {"389900": "INSPIRE-00146525", ...}
     """
+    if xml_source is None:
+        write_message(
+            "Error: failed to parse XML content. (no XML source)",
+            sys.stderr)
+        return
+
+    if not hasattr(xml_source, "read"):
+        xml_source = io.BytesIO(xml_source)
+
+    if InspireTarget is not None:
+        target = InspireTarget()
+    else:
+        target = _AuthorityIdsTarget()
+    parser = etree.XMLParser(target=target, huge_tree=True)
+
     try:
-        root = etree.fromstring(xml_content)
-    except (ValueError, etree.XMLSyntaxError) as e:
+        # Drive the parser with large chunks; both the zlib inflate and the
+        # XML tokenization happen in C while the chunk is processed
+        while True:
+            chunk = xml_source.read(SYNC_GZIP_BUFFER_SIZE)
+            if not chunk:
+                break
+            parser.feed(chunk)
+        authority_ids = parser.close()
+    except (IOError, TypeError, ValueError, etree.XMLSyntaxError) as e:
         write_message(
             "Error: failed to parse XML content. ({0})".format(e),
             sys.stderr)
         return
 
-    authority_ids = {}
+    return authority_ids
+
+
+def _load_cached_authority_ids(cache_path):
+    """Return the cached authority ids dictionary or None."""
+    try:
+        with open(cache_path, "rb") as f:
+            return pickle.load(f)
+    except (IOError, EOFError, pickle.UnpicklingError):
+        return None
+
 
-    for record in root:
-        inspire_id = None
-        cern_id = None
+def _save_cached_authority_ids(
+        cache_path, meta_path, authority_ids, etag, last_modified):
+    """Cache the authority ids dictionary with its HTTP validators."""
+    try:
+        with open(cache_path, "wb") as f:
+            pickle.dump(authority_ids, f, pickle.HIGHEST_PROTOCOL)
+        with open(meta_path, "w") as f:
+            json.dump({"etag": etag, "last_modified": last_modified}, f)
+    except IOError as e:
+        write_message(
+            "Error: failed to write the authority ids cache to "
+            "'{0}'. ({1})".format(cache_path, e),
+            sys.stderr)
 
-        for datafield in record.xpath("datafield[@tag='035']"):
-            if datafield.xpath("subfield[@code='9' and text()='INSPIRE']"):
-                try:
-                    inspire_id = datafield.find("subfield[@code='a']").text
-                except AttributeError:
-                    pass
-            elif datafield.xpath("subfield[@code='9' and text()='CERN']"):
-                try:
-                    cern_id = datafield.find("subfield[@code='a']").text
-                except AttributeError:
-                    pass
 
-        if inspire_id and cern_id:
-            authority_ids[cern_id] = inspire_id
+def get_authority_ids(url, tmp_dir):
+    """Get the authority ids of the INSPIRE dump at 'url'.
+
+    The parsed dictionary is cached in 'tmp_dir' together with the ETag and
+    Last-Modified headers of the dump. INSPIRE publishes the dump monthly;
+    thanks to a conditional GET all runs in between skip both the download
+    and the parse entirely.
+
+    :param string url: valid URL to the gzip (.gz) file
+    :param string tmp_dir: existing directory path for the cache files
+
+    :return: dictionary mapping CCIDs to INSPIRE ids (see
+        'parse_inspire_xml') or None
+    """
+    cache_path = os.path.join(
+        tmp_dir, SYNC_LOCAL_AUTHORITY_IDS_CACHE_FILE_NAME)
+    meta_path = os.path.join(
+        tmp_dir, SYNC_LOCAL_AUTHORITY_IDS_META_FILE_NAME)
+
+    headers = {}
+    if os.path.isfile(cache_path) and os.path.isfile(meta_path):
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (IOError, ValueError):
+            meta = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    xml_stream = get_inspire_dump(url, headers)
+
+    if xml_stream is _NOT_MODIFIED:
+        authority_ids = _load_cached_authority_ids(cache_path)
+        if authority_ids is not None:
+            write_message(
+                "Info: INSPIRE dump has not changed; using the cached "
+                "authority ids")
+            return authority_ids
+        # The cache went missing or is unreadable; fetch unconditionally
+        xml_stream = get_inspire_dump(url)
+
+    if xml_stream is None:
+        return
+
+    authority_ids = parse_inspire_xml(xml_stream)
+
+    if authority_ids:
+        _save_cached_authority_ids(
+            cache_path, meta_path, authority_ids,
+            xml_stream.etag, xml_stream.last_modified)
+
+    xml_stream.close()
 
     return authority_ids
 
@@ -162,7 +432,8 @@ def get_ccid(record_id):
     """Get CCID of given record_id having no INSPIRE authority id.
 
     Consider authority ids stored in MARC field '035__a'. INSPIRE authority id
-    is labeled with the prefix "AUTHOR|(INSPIRE)".
+    is labeled with the prefix "AUTHOR|(INSPIRE)". Thin wrapper around
+    'get_ccids_bulk'.
 
     :param int record_id: record id
         Example 1: MARC XML excerpt of a record having no INSPIRE authority id
@@ -190,97 +461,255 @@ def get_ccid(record_id):
         Example 2:
             'None'
     """
+    return get_ccids_bulk([record_id])[record_id]
+
+
+def _extract_ccid(control_numbers):
+    """Return the CCID found in the given '035__a' values.
+
+    :param list control_numbers: values of MARC field '035__a'
+
+    :return: CCID or None, if an INSPIRE authority id is present
+    """
     cern_id = None
-    # Consider records having no INSPIRE id
-    for control_number in get_fieldvalues(record_id, "035__a"):
-        if control_number.startswith("AUTHOR|(INSPIRE)"):
+    # Consider records having no INSPIRE id. A single rpartition on the
+    # closing parenthesis splits prefix and id in one scan, instead of
+    # matching both prefixes from the start of the value
+    for control_number in control_numbers:
+        head, _, tail = control_number.rpartition(")")
+        if head.endswith(_PREFIX_INSPIRE_HEAD):
             return None
-        elif control_number.startswith("AUTHOR|(SzGeCERN)"):
-            cern_id = control_number.replace("AUTHOR|(SzGeCERN)", "")
+        elif head.endswith(_PREFIX_CERN_HEAD):
+            cern_id = tail
 
     return cern_id
 
 
-def synchronize(record_ids, authority_ids, dest_xml):
+def _get_ccids_threaded(record_ids):
+    """Fallback for 'get_ccids_bulk' without direct SQL access.
+
+    Overlaps the per-record 'get_fieldvalues' queries with a small thread
+    pool, since the loop is I/O-bound on MySQL. Runs serially if the
+    'futures' backport is not installed.
+
+    :param list record_ids: record ids
+
+    :return: dictionary mapping each record id to its CCID or 'None'
+    """
+    def fetch(record_id):
+        return _extract_ccid(get_fieldvalues(record_id, "035__a"))
+
+    if ThreadPoolExecutor is None:
+        return dict((rid, fetch(rid)) for rid in record_ids)
+
+    pool = ThreadPoolExecutor(max_workers=SYNC_THREAD_POOL_SIZE)
+    try:
+        return dict(zip(record_ids, pool.map(fetch, record_ids)))
+    finally:
+        pool.shutdown()
+
+
+def get_ccids_bulk(record_ids):
+    """Get CCIDs for all given record_ids in bulk.
+
+    Fetches the MARC field '035__a' values of all record_ids with a single
+    SQL query per chunk of SYNC_SQL_CHUNK_SIZE ids, instead of one query per
+    record as 'get_fieldvalues' would issue. Falls back to
+    '_get_ccids_threaded' if 'run_sql' is not available.
+
+    :param list record_ids: record ids
+        Example:
+            [2108556, 2148049]
+
+    :return: dictionary mapping each record id to its CCID, or to 'None' if
+        an INSPIRE authority id has been found for this record (see
+        'get_ccid')
+        Example:
+            {2108556: '389900', 2148049: None}
+    """
+    if run_sql is None:
+        return _get_ccids_threaded(record_ids)
+
+    control_numbers = {}
+
+    for start in xrange(0, len(record_ids), SYNC_SQL_CHUNK_SIZE):
+        chunk = record_ids[start:start + SYNC_SQL_CHUNK_SIZE]
+        placeholders = ", ".join(["%s"] * len(chunk))
+        rows = run_sql(
+            "SELECT bb.id_bibrec, b.value "
+            "FROM bib03x AS b "
+            "JOIN bibrec_bib03x AS bb ON b.id = bb.id_bibxxx "
+            "WHERE b.tag = '035__a' "
+            "AND bb.id_bibrec IN ({0})".format(placeholders),
+            tuple(chunk))
+        for record_id, value in rows:
+            control_numbers.setdefault(record_id, []).append(value)
+
+    return dict(
+        (record_id, _extract_ccid(control_numbers.get(record_id, [])))
+        for record_id in record_ids)
+
+
+def _load_synced_ids(path):
+    """Return the set of record ids synchronized by previous runs."""
+    try:
+        with open(path) as f:
+            return set(int(line) for line in f if line.strip())
+    except (IOError, ValueError):
+        return set()
+
+
+def _save_synced_ids(path, synced_ids):
+    """Persist the set of synchronized record ids, one id per line."""
+    try:
+        with open(path, "w") as f:
+            for record_id in sorted(synced_ids):
+                f.write("{0}\n".format(record_id))
+    except IOError as e:
+        write_message(
+            "Error: failed to write the synced record ids to '{0}'. "
+            "({1})".format(path, e),
+            sys.stderr)
+
+
+def synchronize(record_ids, authority_ids, dest_xml, synced_ids_path=None):
     """Synchronize record_ids with authority_ids.
 
     :param list record_ids: list of record ids to synchronize
         Example:
             [2108556, 2148049]
-    :param dict authority_ids: dictionary containing CERN and INSPIRE authority
+    :param dict authority_ids: dictionary mapping CCIDs to INSPIRE authority
         ids. Created by 'parse_inspire_xml'
         Example:
-            {"CERN-389900": "INSPIRE-00146525"}
+            {"389900": "INSPIRE-00146525"}
     :param string dest_xml: file path to write the updates to disk and send to
         bibuplaod
         Example:
             "cds-records-updates.xml"
 
             Output string:
-            <record>
-                <controlfield tag='001'>2108556</controlfield>
-                <datafield tag='035' ind1=' ' ind2=' '>
-                    <subfield code='a'>
-                        AUTHOR|(INSPIRE)INSPIRE-00146525</subfield>
-                </datafield>
-            </record>
+            <collection>
+                <record>
+                    <controlfield tag='001'>2108556</controlfield>
+                    <datafield tag='035' ind1=' ' ind2=' '>
+                        <subfield code='a'>
+                            AUTHOR|(INSPIRE)INSPIRE-00146525</subfield>
+                    </datafield>
+                </record>
+            </collection>
+    :param string synced_ids_path: optional file path persisting the record
+        ids synchronized by previous runs; records listed there are skipped
+        entirely, so steady-state runs only process the delta of new records
+        Example:
+            "cds-synced-record-ids.txt"
     """
-    # String representation of a record element, containing controlfield '001'
-    # and datafield '035__a' storing the record id and INSPIRE id
-    record = ('<record>'
-              '<controlfield tag="001">{0}</controlfield>'
-              '<datafield tag="035" ind1=" " ind2=" ">'
-              '<subfield code="a">AUTHOR|(INSPIRE){1}</subfield>'
-              '</datafield>'
-              '</record>')
-
-    # Create output string
-    output = ""
-    for record_id in record_ids:
-        cern_id = get_ccid(record_id)
+    synced_ids = set()
+    if synced_ids_path:
+        synced_ids = _load_synced_ids(synced_ids_path)
+        if synced_ids:
+            pending = [rid for rid in record_ids if rid not in synced_ids]
+            write_message(
+                "Info: skipping {0} record ids synchronized by previous "
+                "runs".format(len(record_ids) - len(pending)))
+            record_ids = pending
 
-        try:
-            # Get INSPIRE authority id for given CCID, if available
-            inspire_id = authority_ids["CERN-{0}".format(cern_id)]
+    # Fetch the CCIDs for all records with a handful of SQL queries instead
+    # of one query per record
+    ccids = get_ccids_bulk(record_ids)
 
-            # Append record to the output string
-            output += record.format(record_id, inspire_id)
-            write_message(
-                "Info: INSPIRE authority id '{0}' has been added to "
-                "record '{1}'".format(inspire_id, record_id))
+    updated_ids = []
 
-            task_sleep_now_if_required()
-        except KeyError:
-            pass
+    # Write to a '.part' file first and rename it into place below, so
+    # bibupload can never see a partially written document
+    dest_xml_part = dest_xml + ".part"
 
-    if output:
-        # Dump updates to disk ('dest_xml')
-        try:
-            with open(dest_xml, "w") as f:
-                f.write(output)
+    # Reusable record element, containing controlfield '001' and datafield
+    # '035__a'; only the two text slots change per update, which is cheaper
+    # than rebuilding the element structure every time
+    record = etree.Element("record")
+    controlfield = etree.SubElement(record, "controlfield", {"tag": "001"})
+    datafield = etree.SubElement(
+        record, "datafield", {"tag": "035", "ind1": " ", "ind2": " "})
+    subfield = etree.SubElement(datafield, "subfield", {"code": "a"})
 
-            write_message(
-                "Info: updates have been written to '{0}'.".format(dest_xml))
-
-            # Upload (--append) updates to CDS
-            task_id = task_low_level_submission(
-                "bibupload",  # Name
-                "bibauthority-people",  # User
-                "--append", dest_xml,
-                "-P", "-1",
-                "-N", "inspire-authority-ids-synchronizer")
-            write_message(
-                "Info: task '{0}' has been submitted to the scheduler".format(
-                    task_id))
-        except EnvironmentError as e:
-            write_message(
-                "Error: failed to write updates to '{0}'. ({1})".format(
-                    dest_xml, e),
-                sys.stderr)
-            raise
+    try:
+        # Stream each record element to disk as it is built; the full
+        # updates document is never held in memory. Open in binary mode
+        # with a 1 MB buffer to keep the number of syscalls low
+        with open(dest_xml_part, "wb", 1 << 20) as f:
+            with etree.xmlfile(f, encoding="utf-8") as xf:
+                xf.write_declaration()
+                with xf.element("collection"):
+                    for record_id in record_ids:
+                        cern_id = ccids[record_id]
+                        if cern_id is None:
+                            # Record already carries an INSPIRE authority
+                            # id; remember it so the next run skips it
+                            synced_ids.add(record_id)
+                            continue
+
+                        # Get INSPIRE authority id for given CCID, if
+                        # available
+                        inspire_id = authority_ids.get(cern_id)
+                        if inspire_id is None:
+                            continue
+
+                        # Fill in the record id and INSPIRE id and let
+                        # lxml's C serializer write the record in one go
+                        controlfield.text = str(record_id)
+                        subfield.text = _PREFIX_INSPIRE + inspire_id
+                        xf.write(record)
+
+                        updated_ids.append(record_id)
+                        write_message(
+                            "Info: INSPIRE authority id '{0}' has been "
+                            "added to record '{1}'".format(
+                                inspire_id, record_id))
+
+                        task_sleep_now_if_required()
+
+            # Make sure the updates hit the disk before the rename below
+            # publishes them
+            f.flush()
+            os.fsync(f.fileno())
+    except EnvironmentError as e:
+        write_message(
+            "Error: failed to write updates to '{0}'. ({1})".format(
+                dest_xml, e),
+            sys.stderr)
+        raise
+
+    if updated_ids:
+        # Publish the finished document atomically
+        os.rename(dest_xml_part, dest_xml)
+        write_message(
+            "Info: updates have been written to '{0}'.".format(dest_xml))
+
+        # Upload (--append) updates to CDS
+        task_id = task_low_level_submission(
+            "bibupload",  # Name
+            "bibauthority-people",  # User
+            "--append", dest_xml,
+            "-P", "-1",
+            "-N", "inspire-authority-ids-synchronizer")
+        write_message(
+            "Info: task '{0}' has been submitted to the scheduler".format(
+                task_id))
+
+        # Consider the updated records synchronized only now that the
+        # upload task has actually been submitted
+        synced_ids.update(updated_ids)
     else:
+        # Nothing has been written except the empty collection element
+        try:
+            os.remove(dest_xml_part)
+        except OSError:
+            pass
         write_message("Info: no updates for records have been found")
 
+    if synced_ids_path:
+        _save_synced_ids(synced_ids_path, synced_ids)
+
 
 def bst_inspire_authority_ids_synchronizer(
         url=SYNC_URL_INSPIRE_RECORDS_SRC, tmp_dir=SYNC_LOCAL_TMP_DIR):
@@ -289,12 +718,7 @@ def bst_inspire_authority_ids_synchronizer(
     :param string url: valid URL to the gzip (.gz) file
     :param string tmp_dir: existing directory path for temporary files
     """
-    xml_content = get_inspire_dump(
-        url, os.path.join(tmp_dir, SYNC_LOCAL_INSPIRE_RECORDS_FILE_NAME))
-
-    task_sleep_now_if_required()
-
-    authority_ids = parse_inspire_xml(xml_content)
+    authority_ids = get_authority_ids(url, tmp_dir)
 
     task_sleep_now_if_required()
 
@@ -306,5 +730,8 @@ def bst_inspire_authority_ids_synchronizer(
             synchronize(
                 record_ids,
                 authority_ids,
-                os.path.join(tmp_dir, SYNC_LOCAL_CDS_RECORDS_UPDATES_FILE_NAME))
+                os.path.join(
+                    tmp_dir, SYNC_LOCAL_CDS_RECORDS_UPDATES_FILE_NAME),
+                os.path.join(
+                    tmp_dir, SYNC_LOCAL_SYNCED_RECORD_IDS_FILE_NAME))
 
@@ -0,0 +1,17 @@
+"""Build the optional Cython parser target.
+
+Usage:
+    $ pip install cython
+    $ python setup.py build_ext --inplace
+
+'bst_inspire_authority_ids_synchronizer' picks up the compiled module
+automatically and falls back to its pure Python target otherwise.
+"""
+
+from distutils.core import setup
+
+from Cython.Build import cythonize
+
+setup(
+    name="inspire-target",
+    ext_modules=cythonize("inspire_target.pyx"))
@@ -21,49 +21,32 @@ class TestSynchronizer(unittest.TestCase):
         self.assertTrue(os.path.isdir(sync.SYNC_LOCAL_TMP_DIR))
 
     def test_get_inspire_dump(self):
-        """Test given the default URL and local file path."""
+        """Test given the default URL."""
         url = sync.SYNC_URL_INSPIRE_RECORDS_SRC
-        tmp = os.path.join(
-            sync.SYNC_LOCAL_TMP_DIR,
-            sync.SYNC_LOCAL_INSPIRE_RECORDS_FILE_NAME)
 
-        xml_file_content = sync.get_inspire_dump(url, tmp)
+        xml_stream = sync.get_inspire_dump(url)
 
-        self.assertTrue(xml_file_content)
-        self.assertFalse(os.path.isfile(tmp))
+        self.assertTrue(xml_stream)
+        self.assertTrue(xml_stream.read(10))
+        xml_stream.close()
 
     def test_get_inspire_dump_invalid_url(self):
         """Test given a invalid URL."""
         url = "http://inspirehep.net/dumps/HepNames-records.xml.gzzzz"
-        tmp = os.path.join(
-            sync.SYNC_LOCAL_TMP_DIR,
-            sync.SYNC_LOCAL_INSPIRE_RECORDS_FILE_NAME)
-
-        xml_file_content = sync.get_inspire_dump(url, tmp)
-
-        self.assertEqual(xml_file_content, None)
-        self.assertFalse(os.path.isfile(tmp))
-
-    def test_get_inspire_dump_invalid_file_path(self):
-        """Test given a invalid local file path."""
-        url = sync.SYNC_URL_INSPIRE_RECORDS_SRC
-        tmp = "/tmp/"
 
-        xml_file_content = sync.get_inspire_dump(url, tmp)
+        xml_stream = sync.get_inspire_dump(url)
 
-        self.assertEqual(xml_file_content, None)
-        self.assertFalse(os.path.isfile(tmp))
+        self.assertEqual(xml_stream, None)
 
     def test_parse_inspire_xml(self):
         """Test 'xml_content' as valid XML."""
-        with open("HepNames-records-excerpt.xml") as f:
-            xml_content = f.read()
-        authority_ids = sync.parse_inspire_xml(xml_content)
+        with open("HepNames-records-excerpt.xml", "rb") as f:
+            authority_ids = sync.parse_inspire_xml(f)
 
-        self.assertEqual(authority_ids["CERN-389900"], "INSPIRE-00146525")
-        self.assertEqual(authority_ids["CERN-389882"], "INSPIRE-00079322")
-        self.assertEqual(authority_ids["CERN-389853"], "INSPIRE-00079313")
-        self.assertEqual(authority_ids["CERN-389849"], "INSPIRE-00079305")
+        self.assertEqual(authority_ids["389900"], "INSPIRE-00146525")
+        self.assertEqual(authority_ids["389882"], "INSPIRE-00079322")
+        self.assertEqual(authority_ids["389853"], "INSPIRE-00079313")
+        self.assertEqual(authority_ids["389849"], "INSPIRE-00079305")
 
         xml_content = "<record></record>"
         authority_ids = sync.parse_inspire_xml(xml_content)
@@ -87,6 +70,39 @@ class TestSynchronizer(unittest.TestCase):
         authority_ids = sync.parse_inspire_xml(xml_content)
         self.assertEqual(authority_ids, None)
 
+    def test_authority_ids_cache_roundtrip(self):
+        """Test saving and loading the authority ids cache."""
+        cache = os.path.join(
+            sync.SYNC_LOCAL_TMP_DIR,
+            sync.SYNC_LOCAL_AUTHORITY_IDS_CACHE_FILE_NAME)
+        meta = os.path.join(
+            sync.SYNC_LOCAL_TMP_DIR,
+            sync.SYNC_LOCAL_AUTHORITY_IDS_META_FILE_NAME)
+
+        authority_ids = {"389900": "INSPIRE-00146525"}
+        sync._save_cached_authority_ids(
+            cache, meta, authority_ids,
+            '"d41d8cd98f"', "Mon, 01 Jun 2015 00:00:00 GMT")
+
+        self.assertEqual(sync._load_cached_authority_ids(cache), authority_ids)
+        self.assertTrue(os.path.isfile(meta))
+
+        os.remove(cache)
+        os.remove(meta)
+
+    def test_synced_ids_roundtrip(self):
+        """Test saving and loading the synced record ids."""
+        path = os.path.join(
+            sync.SYNC_LOCAL_TMP_DIR,
+            sync.SYNC_LOCAL_SYNCED_RECORD_IDS_FILE_NAME)
+
+        sync._save_synced_ids(path, set([2108556, 2148049]))
+        self.assertEqual(
+            sync._load_synced_ids(path), set([2108556, 2148049]))
+
+        os.remove(path)
+        self.assertEqual(sync._load_synced_ids(path), set())
+
     def test_get_record_ids(self):
         """Test the list of record ids for a given record id."""
         record_ids = sync.get_record_ids()
@@ -113,6 +129,16 @@ class TestSynchronizer(unittest.TestCase):
         cern_id = sync.get_ccid(2148049)
         self.assertEqual(cern_id, None)
 
+    def test_get_ccids_bulk(self):
+        """Test 'get_ccids_bulk' for both authority records at once.
+
+        Using the same CDS records as 'test_get_ccid' and
+        'test_get_ccid_with_inspire_id'.
+        """
+        ccids = sync.get_ccids_bulk([2108556, 2148049])
+        self.assertEqual(ccids[2108556], "389900")
+        self.assertEqual(ccids[2148049], None)
+
 
 if __name__ == '__main__':
     unittest.main()